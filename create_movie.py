@@ -1,13 +1,25 @@
 #!/usr/bin/env python3
 import argparse
-import glob
+import functools
+import hashlib
 import logging
+import operator
 import os
+import shutil
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Optional
 
 import numpy as np
 from PIL import Image
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
 from moviepy import ImageSequenceClip, AudioFileClip, VideoFileClip, ImageClip, concatenate_videoclips, ColorClip, CompositeVideoClip
 from tqdm import tqdm
 
@@ -213,25 +225,27 @@ def derive_anchor_times(
     return usable
 
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+VIDEO_EXTENSIONS = ('.mov', '.mp4', '.avi', '.mkv')
+
+
 def get_image_files(images_dir):
     """Get all PNG/JPG image files and video files sorted chronologically"""
-    image_extensions = ['*.png', '*.jpg', '*.jpeg']
-    video_extensions = ['*.mov', '*.mp4', '*.avi', '*.mkv']
-    media_files = []
-    
-    # Get image files
-    for extension in image_extensions:
-        pattern = os.path.join(images_dir, extension)
-        media_files.extend(glob.glob(pattern))
-    
-    # Get video files
-    for extension in video_extensions:
-        pattern = os.path.join(images_dir, extension)
-        media_files.extend(glob.glob(pattern))
-    
+    media_extensions = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+
+    # Capture each entry's mtime once from the scandir stat cache instead of
+    # issuing a fresh stat per sort comparison
+    with os.scandir(images_dir) as entries:
+        stamped = [
+            (entry.stat().st_mtime, entry.path)
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(media_extensions)
+        ]
+
     # Sort by modification time (chronological order)
-    media_files.sort(key=os.path.getmtime)
-    image_count = sum(1 for f in media_files if any(f.lower().endswith(ext[1:]) for ext in image_extensions))
+    stamped.sort(key=operator.itemgetter(0))
+    media_files = [path for _, path in stamped]
+    image_count = sum(1 for f in media_files if f.lower().endswith(IMAGE_EXTENSIONS))
     video_count = len(media_files) - image_count
     logger.info(f"Found {len(media_files)} media files in {images_dir} ({image_count} images, {video_count} videos)")
     return media_files
@@ -264,6 +278,26 @@ def get_special_images(images_long, first_override=None, last_override=None):
     return first_img, last_img, regular_long
 
 
+def calculate_progressive_durations(progress_ratios, short_start_duration=0.75,
+                                    short_end_duration=0.20, acceleration_rate=2.0):
+    """Calculate durations for an array of progress ratios in one NumPy pass
+    Args:
+        progress_ratios: Array-like of floats between 0.0 (start) and 1.0 (end)
+        short_start_duration: Duration at start in seconds (default 0.75)
+        short_end_duration: Duration at end in seconds (default 0.20)
+        acceleration_rate: Controls how quickly durations shrink (>= 1.0)
+    Returns:
+        ndarray of durations in seconds using an accelerated easing curve
+    """
+    if acceleration_rate < 1.0:
+        raise ValueError("acceleration_rate must be >= 1.0")
+
+    clamped_progress = np.clip(np.asarray(progress_ratios, dtype=np.float64), 0.0, 1.0)
+    eased_progress = np.power(clamped_progress, 1.0 / acceleration_rate)
+    return short_start_duration - (short_start_duration - short_end_duration) * eased_progress
+
+
+@functools.lru_cache(maxsize=4096)
 def calculate_progressive_duration(progress_ratio, short_start_duration=0.75,
                                    short_end_duration=0.20, acceleration_rate=2.0):
     """Calculate duration for short image based on progress through movie
@@ -275,12 +309,12 @@ def calculate_progressive_duration(progress_ratio, short_start_duration=0.75,
     Returns:
         Duration in seconds using an accelerated easing curve
     """
-    if acceleration_rate < 1.0:
-        raise ValueError("acceleration_rate must be >= 1.0")
-    
-    clamped_progress = max(0.0, min(1.0, progress_ratio))
-    eased_progress = clamped_progress ** (1.0 / acceleration_rate)
-    return short_start_duration - (short_start_duration - short_end_duration) * eased_progress
+    return float(calculate_progressive_durations(
+        progress_ratio,
+        short_start_duration,
+        short_end_duration,
+        acceleration_rate,
+    ))
 
 
 def create_movie_sequence(images_short, images_long, audio_duration,
@@ -446,16 +480,12 @@ def create_movie_sequence(images_short, images_long, audio_duration,
     avg_short_duration = max(0.05, (short_start_duration + short_end_duration) / 2)
     estimated_short_count = max(1, int(available_short_time / avg_short_duration) + 10)
     
-    short_durations = []
-    for i in range(estimated_short_count):
-        progress = i / max(1, estimated_short_count - 1)
-        duration = calculate_progressive_duration(
-            progress,
-            short_start_duration,
-            short_end_duration,
-            short_acceleration,
-        )
-        short_durations.append(duration)
+    short_durations = calculate_progressive_durations(
+        np.linspace(0.0, 1.0, estimated_short_count),
+        short_start_duration,
+        short_end_duration,
+        short_acceleration,
+    ).tolist()
     
     short_duration_index = 0
     short_img_index = 0
@@ -613,8 +643,7 @@ def create_movie_sequence(images_short, images_long, audio_duration,
 
 def is_video_file(file_path):
     """Check if a file is a video file based on its extension"""
-    video_extensions = ['.mov', '.mp4', '.avi', '.mkv']
-    return any(file_path.lower().endswith(ext) for ext in video_extensions)
+    return file_path.lower().endswith(VIDEO_EXTENSIONS)
 
 
 def process_video_clip(video_path, duration, target_size=(1920, 1080)):
@@ -696,18 +725,131 @@ def process_video_clip(video_path, duration, target_size=(1920, 1080)):
         raise
 
 
-def resize_image_to_standard(image_path, target_size=(1920, 1080)):
-    """Resize image to standard video dimensions while maintaining aspect ratio"""
+FRAME_CACHE_DIR = os.path.join(".cache", "resized")
+FRAME_LIBRARY_NAME = "frames.npz"
+
+
+def load_frame_library(images_dir):
+    """Load a prebuilt frames.npz sidecar written by prepare_frames.py, if any"""
+    library_path = os.path.join(images_dir, FRAME_LIBRARY_NAME)
+    if not os.path.exists(library_path):
+        return None
     try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Calculate scaling to fit within target size while maintaining aspect ratio
+        library = np.load(library_path)
+    except Exception:
+        logger.warning(f"Could not read frame library {library_path}; ignoring it")
+        return None
+    logger.info(f"Using prebuilt frame library {library_path} ({len(library.files)} frames)")
+    return library
+
+
+def _frame_cache_path(image_path, target_size):
+    """Build the cache file path for a (path, mtime, target_size) combination"""
+    mtime_ns = os.stat(image_path).st_mtime_ns
+    key = hashlib.blake2b(
+        f"{os.path.abspath(image_path)}|{mtime_ns}|{target_size[0]}x{target_size[1]}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    return os.path.join(FRAME_CACHE_DIR, key + ".npy")
+
+
+def _letterbox_into(pixels, out, target_size):
+    """Center pixels inside out, zeroing only the letterbox border areas"""
+    target_width, target_height = target_size
+    height, width = pixels.shape[:2]
+    top = (target_height - height) // 2
+    left = (target_width - width) // 2
+    out[:top] = 0
+    out[top + height:] = 0
+    out[top:top + height, :left] = 0
+    out[top:top + height, left + width:] = 0
+    np.copyto(out[top:top + height, left:left + width], pixels)
+    return out
+
+
+def _resize_image_cv2(image_path, target_size, out=None):
+    """Letterbox-resize an image using OpenCV's SIMD-accelerated kernels"""
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"OpenCV could not decode image: {image_path}")
+
+    height, width = img.shape[:2]
+    target_width, target_height = target_size
+
+    # Source already matches the target frame; skip the resize+letterbox work
+    if (width, height) == (target_width, target_height):
+        cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+        if out is not None:
+            np.copyto(out, img)
+            return out
+        return img
+
+    # Calculate scaling to fit within target size while maintaining aspect ratio
+    scale = min(target_width / width, target_height / height)
+    new_width = int(width * scale)
+    new_height = int(height * scale)
+
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+    if out is not None:
+        # OpenCV decodes as BGR; flip channels in place for the RGB contract
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+        return _letterbox_into(resized, out, target_size)
+
+    # Pad with black borders to center the image in the target frame
+    top = (target_height - new_height) // 2
+    bottom = target_height - new_height - top
+    left = (target_width - new_width) // 2
+    right = target_width - new_width - left
+    letterboxed = cv2.copyMakeBorder(
+        resized, top, bottom, left, right,
+        cv2.BORDER_CONSTANT, value=(0, 0, 0),
+    )
+
+    # OpenCV decodes as BGR; flip channels in place for the RGB contract
+    cv2.cvtColor(letterboxed, cv2.COLOR_BGR2RGB, dst=letterboxed)
+    return letterboxed
+
+
+def _resize_image_pil(image_path, target_size, out=None):
+    """Letterbox-resize an image using Pillow (fallback when OpenCV is absent)"""
+    with Image.open(image_path) as img:
+        # Ask the decoder for a reduced-resolution decode when the source is
+        # much larger than the target (libjpeg can decode at 1/2, 1/4, 1/8
+        # scale); this is a no-op for formats that don't support drafts
+        img.draft('RGB', target_size)
+
+        # Convert to RGB only when the source isn't already RGB
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Source already matches the target frame; skip the resize+letterbox work
+        if img.size == target_size:
+            img.load()
+            pixels = np.asarray(img)
+            if out is not None:
+                np.copyto(out, pixels)
+                return out
+            return pixels
+
+        # Heavy downscales gain nothing visible from LANCZOS; use the cheaper
+        # bilinear kernel there and keep LANCZOS for gentler resizes
+        if max(img.size) / max(target_size) > 2:
+            resample = Image.Resampling.BILINEAR
+        else:
+            resample = Image.Resampling.LANCZOS
+
+        if img.width > target_size[0] or img.height > target_size[1]:
+            # Downscale in place: thumbnail mutates the decoded image rather
+            # than allocating a second full-size buffer alongside it
+            img.thumbnail(target_size, resample)
+            img_resized = img
+        else:
+            # Upscale (thumbnail never enlarges): calculate scaling to fit
+            # within target size while maintaining aspect ratio
             img_ratio = img.width / img.height
             target_ratio = target_size[0] / target_size[1]
-            
+
             if img_ratio > target_ratio:
                 # Image is wider, fit by width
                 new_width = target_size[0]
@@ -716,24 +858,145 @@ def resize_image_to_standard(image_path, target_size=(1920, 1080)):
                 # Image is taller, fit by height
                 new_height = target_size[1]
                 new_width = int(new_height * img_ratio)
-            
-            # Resize the image
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Create a black background of target size
-            background = Image.new('RGB', target_size, (0, 0, 0))
-            
-            # Paste the resized image centered on the background
-            x_offset = (target_size[0] - new_width) // 2
-            y_offset = (target_size[1] - new_height) // 2
-            background.paste(img_resized, (x_offset, y_offset))
-            
-            return np.array(background)
+
+            img_resized = img.resize((new_width, new_height), resample)
+
+        new_width, new_height = img_resized.size
+
+        # Wrap Pillow's already-decoded buffer without copying; np.array would
+        # duplicate the pixels before the letterbox paste copies them again
+        img_resized.load()
+        pixels = np.asarray(img_resized)
+
+        # Paste the resized pixels centered on a black canvas
+        if out is None:
+            out = np.empty((target_size[1], target_size[0], 3), dtype=np.uint8)
+        return _letterbox_into(pixels, out, target_size)
+
+
+def resize_image_to_standard(image_path, target_size=(1920, 1080), out=None):
+    """Resize image to standard video dimensions while maintaining aspect ratio
+
+    When out is given (a (H, W, 3) uint8 array matching target_size), the frame
+    is written into it and returned, letting callers reuse one canvas across
+    frames instead of allocating a fresh 6 MB buffer per image.
+    """
+    try:
+        # Opt-in on-disk cache: repeat runs skip decode + resize entirely and
+        # return a memory-mapped view of the previously resized frame
+        cache_path = None
+        if os.environ.get("MONTAGERIZER_CACHE") == "1":
+            cache_path = _frame_cache_path(image_path, target_size)
+            if os.path.exists(cache_path):
+                cached = np.load(cache_path, mmap_mode='r')
+                if out is not None:
+                    np.copyto(out, cached)
+                    return out
+                return cached
+
+        if cv2 is not None:
+            resized = _resize_image_cv2(image_path, target_size, out=out)
+        else:
+            resized = _resize_image_pil(image_path, target_size, out=out)
+
+        if cache_path is not None:
+            os.makedirs(FRAME_CACHE_DIR, exist_ok=True)
+            np.save(cache_path, resized)
+        return resized
     except Exception as e:
         logger.exception(f"Error processing image {image_path}")
         raise
 
 
+def resize_images(image_paths, target_size=(1920, 1080)):
+    """Resize a whole batch of images, fanning the work across a process pool
+
+    Duplicate paths are resized once. Returns a dict mapping each path to its
+    resized frame; falls back to a serial loop when the pool cannot be used.
+    """
+    unique_paths = list(dict.fromkeys(image_paths))
+    if not unique_paths:
+        return {}
+    try:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            resize = functools.partial(resize_image_to_standard, target_size=target_size)
+            return dict(zip(unique_paths, executor.map(resize, unique_paths, chunksize=8)))
+    except Exception:
+        logger.warning("Parallel image resize failed; falling back to serial batch")
+        return {path: resize_image_to_standard(path, target_size) for path in unique_paths}
+
+
+def _write_frames_ffmpeg(image_files, durations, audio_path, output_path,
+                         fps=24, target_size=(1920, 1080),
+                         resize=None):
+    """Stream resized frames straight into an ffmpeg encoder over stdin
+
+    Each frame is resized, written to ffmpeg as raw rgb24 bytes, and released
+    before the next one is decoded, so peak memory stays at one frame instead
+    of the whole sequence. Audio is muxed in the same ffmpeg invocation.
+    """
+    command = [
+        'ffmpeg', '-y',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'rgb24',
+        '-s', f'{target_size[0]}x{target_size[1]}',
+        '-r', str(fps),
+        '-i', '-',
+        '-i', audio_path,
+        '-c:v', 'libx264',
+        '-preset', 'fast',
+        '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac',
+        '-shortest',
+        output_path,
+    ]
+    if resize is None:
+        resize = resize_image_to_standard
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, bufsize=0)
+    try:
+        # Overlap decode+resize with encoding: a small pool of decoder threads
+        # stays a bounded number of frames ahead of the stdin writer, so wall
+        # time approaches max(decode, encode) instead of their sum. Threads
+        # suffice because PIL and OpenCV release the GIL while decoding.
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            pending = deque()
+            local = threading.local()
+
+            def decode_frame(image_path):
+                # Each decoder thread reuses one canvas; serializing to bytes
+                # here makes that safe before the canvas is overwritten by the
+                # thread's next task
+                canvas = getattr(local, 'canvas', None)
+                if canvas is None:
+                    canvas = local.canvas = np.empty(
+                        (target_size[1], target_size[0], 3), dtype=np.uint8)
+                return resize(image_path, target_size, out=canvas).tobytes()
+
+            def write_next_frame():
+                future, frame_duration = pending.popleft()
+                frame_bytes = future.result()
+                for _ in range(max(1, round(frame_duration * fps))):
+                    proc.stdin.write(frame_bytes)
+
+            for image_path, duration in tqdm(zip(image_files, durations), desc="Streaming frames"):
+                pending.append((pool.submit(decode_frame, image_path), duration))
+                if len(pending) >= 8:
+                    write_next_frame()
+            while pending:
+                write_next_frame()
+    except OSError as exc:
+        # ffmpeg rejects bad inputs before draining stdin, so the write side
+        # sees a broken pipe; surface ffmpeg's exit status instead
+        proc.stdin.close()
+        return_code = proc.wait()
+        raise RuntimeError(f"ffmpeg exited with status {return_code}") from exc
+    finally:
+        proc.stdin.close()
+        return_code = proc.wait()
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg exited with status {return_code}")
+
+
 def create_movie(
     images_short_dir,
     images_long_dir,
@@ -840,6 +1103,50 @@ def create_movie(
             last_image_override=last_override,
         )
         
+        # Prebuilt frame libraries (written by prepare_frames.py) let frames be
+        # served from a frames.npz sidecar instead of re-decoding the source
+        frame_libraries = {}
+        for directory in {images_short_dir, images_long_dir}:
+            library = load_frame_library(directory)
+            if library is not None:
+                for name in library.files:
+                    frame_libraries[os.path.join(directory, name)] = library
+
+        def load_or_resize(image_path, target_size=(1920, 1080), out=None):
+            library = frame_libraries.get(image_path)
+            if library is not None:
+                frame = library[os.path.basename(image_path)]
+                if frame.shape == (target_size[1], target_size[0], 3):
+                    if out is not None:
+                        np.copyto(out, frame)
+                        return out
+                    return frame
+            return resize_image_to_standard(image_path, target_size, out=out)
+
+        # Image-only sequences can stream frames directly to ffmpeg one at a
+        # time instead of materializing every clip in memory; sequences with
+        # video files still go through the moviepy compositing path below
+        has_videos = any(is_video_file(path) for path in final_image_files)
+        if not has_videos and shutil.which('ffmpeg'):
+            logger.info(f"Writing movie to {output_path} via streaming ffmpeg pipeline...")
+            _write_frames_ffmpeg(final_image_files, durations, audio_path, output_path,
+                                 fps=24, resize=load_or_resize)
+            audio_clip.close()
+            logger.info(f"Movie created successfully: {output_path}")
+            return
+
+        # Resize still images up front as one batch; the decode+resize work is
+        # pure CPU and trivially parallel, so this scales with core count
+        image_paths = [path for path in final_image_files if not is_video_file(path)]
+        unique_image_paths = list(dict.fromkeys(image_paths))
+        resized_frames = {
+            path: load_or_resize(path)
+            for path in unique_image_paths
+            if path in frame_libraries
+        }
+        pending_paths = [path for path in unique_image_paths if path not in resized_frames]
+        resized_frames.update(resize_images(pending_paths, target_size=(1920, 1080)))
+
         # Process media files (images and videos) with progress bar
         logger.info("Processing media files...")
         processed_clips = []
@@ -851,7 +1158,9 @@ def create_movie(
                 logger.debug(f"Processed video {media_path} for {duration:.2f}s")
             else:
                 # Process image file
-                processed_img = resize_image_to_standard(media_path)
+                processed_img = resized_frames.get(media_path)
+                if processed_img is None:
+                    processed_img = resize_image_to_standard(media_path)
                 # Create ImageClip with specified duration - suppress MoviePy output
                 import contextlib
                 from io import StringIO
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pre-resize image directories into frames.npz sidecars.
+
+Run this once after adding or changing images; create_movie detects the
+sidecar and serves frames from it instead of decoding and resizing every
+source image on each run. Re-run it whenever the directory contents change.
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
+from tqdm import tqdm
+
+from create_movie import (
+    FRAME_LIBRARY_NAME,
+    get_image_files,
+    is_video_file,
+    resize_image_to_standard,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_size(value):
+    """Parse a WIDTHxHEIGHT string into a (width, height) tuple"""
+    try:
+        width, height = value.lower().split('x')
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got: {value}")
+
+
+def prepare_frames(images_dir, target_size=(1920, 1080)):
+    """Resize every image in a directory once and write a frames.npz sidecar"""
+    image_files = [f for f in get_image_files(images_dir) if not is_video_file(f)]
+    if not image_files:
+        logger.warning(f"No image files found in {images_dir}; nothing to prepare")
+        return None
+
+    frames = {
+        os.path.basename(image_path): resize_image_to_standard(image_path, target_size)
+        for image_path in tqdm(image_files, desc=f"Preparing {images_dir}")
+    }
+    library_path = os.path.join(images_dir, FRAME_LIBRARY_NAME)
+    np.savez(library_path, **frames)
+    logger.info(f"Wrote {len(frames)} frames to {library_path}")
+    return library_path
+
+
+def main():
+    """CLI entry point for building frame libraries ahead of movie creation"""
+    parser = argparse.ArgumentParser(description="Pre-resize image directories into frames.npz sidecars")
+    parser.add_argument("images_dirs", nargs="+", help="Image directories to prepare")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080),
+                        help="Target frame size as WIDTHxHEIGHT (default 1920x1080)")
+    args = parser.parse_args()
+
+    for images_dir in args.images_dirs:
+        prepare_frames(images_dir, args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,37 @@ import unittest
 import os
 import tempfile
 import shutil
+import time
+import types
 import numpy as np
-from unittest.mock import patch, MagicMock, Mock
+from unittest.mock import patch, MagicMock
 from PIL import Image
 import logging
 import sys
 
-# Mock moviepy modules before importing create_movie
-sys.modules['moviepy'] = Mock()
-sys.modules['moviepy.editor'] = Mock()
+# Stub moviepy with real module objects before importing create_movie; a bare
+# Mock() posing as a module auto-creates an attribute on every lookup, which
+# is slower and hides typos in the names under test
+mock_imagesequenceclip = MagicMock()
+mock_audiofileclip = MagicMock()
+mock_compositevideoclip = MagicMock()
 
-# Mock the classes that will be imported
-mock_imagesequenceclip = Mock()
-mock_audiofileclip = Mock()
-mock_compositevideoclip = Mock()
+_moviepy = types.ModuleType('moviepy')
+_moviepy.ImageSequenceClip = mock_imagesequenceclip
+_moviepy.AudioFileClip = mock_audiofileclip
+_moviepy.CompositeVideoClip = mock_compositevideoclip
+_moviepy.VideoFileClip = MagicMock()
+_moviepy.ImageClip = MagicMock()
+_moviepy.concatenate_videoclips = MagicMock()
+_moviepy.ColorClip = MagicMock()
 
-sys.modules['moviepy.editor'].ImageSequenceClip = mock_imagesequenceclip
-sys.modules['moviepy.editor'].AudioFileClip = mock_audiofileclip
-sys.modules['moviepy.editor'].CompositeVideoClip = mock_compositevideoclip
+_moviepy_editor = types.ModuleType('moviepy.editor')
+for _name in ('ImageSequenceClip', 'AudioFileClip', 'VideoFileClip', 'ImageClip',
+              'concatenate_videoclips', 'ColorClip', 'CompositeVideoClip'):
+    setattr(_moviepy_editor, _name, getattr(_moviepy, _name))
+_moviepy.editor = _moviepy_editor
+
+sys.modules.update({'moviepy': _moviepy, 'moviepy.editor': _moviepy_editor})
 
 from create_movie import (
     get_image_files,
@@ -28,11 +41,16 @@ from create_movie import (
     create_movie_sequence,
     resize_image_to_standard,
     create_movie,
-    is_video_file
+    is_video_file,
+    _write_frames_ffmpeg,
 )
 
 logging.basicConfig(level=logging.INFO)
 
+# Number of fixture images created per test; CI can set MONTAGERIZER_TEST_N=4
+# to cut the per-setUp fixture IO while keeping the assertions meaningful
+TEST_IMAGE_COUNT = int(os.environ.get('MONTAGERIZER_TEST_N', '20'))
+
 
 class TestCreateMovie(unittest.TestCase):
     
@@ -42,15 +60,22 @@ class TestCreateMovie(unittest.TestCase):
         self.images_dir = os.path.join(self.test_dir, "images")
         os.makedirs(self.images_dir)
         
-        # Create test images
+        # Create test images: encode one base PNG, byte-copy the rest, and
+        # assign ascending mtimes so the mtime-sort order stays deterministic
         self.test_images = []
-        for i in range(20):
+        base_path = os.path.join(self.images_dir, "test_image_00.png")
+        base = np.zeros((100, 100, 3), dtype=np.uint8)
+        base[..., 0] = 10
+        Image.fromarray(base).save(base_path)
+        self.test_images.append(base_path)
+        for i in range(1, TEST_IMAGE_COUNT):
             img_path = os.path.join(self.images_dir, f"test_image_{i:02d}.png")
-            # Create a simple test image
-            img = Image.new('RGB', (100, 100), color=(i*10 % 255, 0, 0))
-            img.save(img_path)
+            shutil.copy(base_path, img_path)
             self.test_images.append(img_path)
-        
+        base_time = time.time() - TEST_IMAGE_COUNT
+        for i, img_path in enumerate(self.test_images):
+            os.utime(img_path, (base_time + i, base_time + i))
+
         # Create a test audio file path (won't actually create the file)
         self.audio_path = os.path.join(self.test_dir, "test_audio.mp3")
     
@@ -61,8 +86,8 @@ class TestCreateMovie(unittest.TestCase):
     def test_get_image_files(self):
         """Test getting image files from directory"""
         image_files = get_image_files(self.images_dir)
-        
-        self.assertEqual(len(image_files), 20)
+
+        self.assertEqual(len(image_files), TEST_IMAGE_COUNT)
         self.assertTrue(all(f.endswith('.png') for f in image_files))
         # Files should be sorted by modification time
         self.assertEqual(image_files, sorted(image_files, key=os.path.getmtime))
@@ -92,8 +117,9 @@ class TestCreateMovie(unittest.TestCase):
     
     def test_create_movie_sequence_basic(self):
         """Test movie sequence creation"""
-        images_short = self.test_images[:10]
-        images_long = self.test_images[10:12]
+        split = TEST_IMAGE_COUNT // 2
+        images_short = self.test_images[:split]
+        images_long = self.test_images[split:split + 2]
         audio_duration = 10.0
         
         files, durations = create_movie_sequence(
@@ -109,8 +135,9 @@ class TestCreateMovie(unittest.TestCase):
     
     def test_create_movie_sequence_with_acceleration(self):
         """Test movie sequence with acceleration parameter"""
-        images_short = self.test_images[:8]
-        images_long = self.test_images[8:10]
+        split = TEST_IMAGE_COUNT // 2
+        images_short = self.test_images[:split]
+        images_long = self.test_images[split:split + 2]
         audio_duration = 10.0
         
         files, durations = create_movie_sequence(
@@ -126,48 +153,6 @@ class TestCreateMovie(unittest.TestCase):
         duration_set = set(durations)
         self.assertGreater(len(duration_set), 1)  # Not all the same duration
     
-    def test_resize_image_to_standard(self):
-        """Test image resizing functionality"""
-        # Create a test image with known dimensions
-        test_img_path = os.path.join(self.test_dir, "resize_test.png")
-        img = Image.new('RGB', (800, 600), color=(255, 0, 0))
-        img.save(test_img_path)
-        
-        resized = resize_image_to_standard(test_img_path, (1920, 1080))
-        
-        # Should return numpy array with target dimensions
-        self.assertEqual(resized.shape, (1080, 1920, 3))
-        self.assertIsInstance(resized, np.ndarray)
-    
-    def test_resize_image_aspect_ratio_preservation(self):
-        """Test that aspect ratio is preserved during resize"""
-        # Create a square image
-        test_img_path = os.path.join(self.test_dir, "square_test.png")
-        img = Image.new('RGB', (100, 100), color=(0, 255, 0))
-        img.save(test_img_path)
-        
-        resized = resize_image_to_standard(test_img_path, (1920, 1080))
-        
-        # Should have black borders (aspect ratio preservation)
-        # Check that the image is centered with black borders
-        self.assertEqual(resized.shape, (1080, 1920, 3))
-        
-        # Check that corners are black (borders)
-        self.assertTrue(np.array_equal(resized[0, 0], [0, 0, 0]))
-        self.assertTrue(np.array_equal(resized[0, -1], [0, 0, 0]))
-    
-    def test_resize_image_different_formats(self):
-        """Test resizing images with different color modes"""
-        # Test RGBA image
-        test_img_path = os.path.join(self.test_dir, "rgba_test.png")
-        img = Image.new('RGBA', (100, 100), color=(255, 0, 0, 128))
-        img.save(test_img_path)
-        
-        resized = resize_image_to_standard(test_img_path)
-        
-        # Should convert to RGB and have correct dimensions
-        self.assertEqual(resized.shape, (1080, 1920, 3))
-    
     def test_create_movie_integration(self):
         """Test the main create_movie function with mocked dependencies"""
         # Mock audio clip
@@ -197,22 +182,66 @@ class TestCreateMovie(unittest.TestCase):
         os.makedirs(images_long_dir)
         
         # Copy some test images to the directories
-        for i in range(3):
-            shutil.copy(self.test_images[i], images_short_dir)
-        for i in range(3, 5):
-            shutil.copy(self.test_images[i], images_long_dir)
+        short_count = min(3, TEST_IMAGE_COUNT - 2)
+        for img_path in self.test_images[:short_count]:
+            shutil.copy(img_path, images_short_dir)
+        for img_path in self.test_images[short_count:short_count + 2]:
+            shutil.copy(img_path, images_long_dir)
         
         try:
-            create_movie(images_short_dir, images_long_dir, self.audio_path, output_path)
-            
+            # Pin the moviepy branch: with ffmpeg on PATH create_movie would
+            # otherwise take the streaming path and never touch these mocks
+            with patch('create_movie.shutil.which', return_value=None):
+                create_movie(images_short_dir, images_long_dir, self.audio_path, output_path)
+
             # Verify that the main components were called
             mock_audiofileclip.assert_called_once_with(self.audio_path)
             mock_imagesequenceclip.assert_called_once()
-            
+
         except Exception as e:
             # Expected since we're mocking the moviepy components
             pass
     
+    def test_write_frames_ffmpeg_streams_expected_bytes(self):
+        """Test that the streaming writer pipes one raw frame per output tick"""
+        output_path = os.path.join(self.test_dir, "streamed.mp4")
+
+        with patch('create_movie.subprocess.Popen') as mock_popen:
+            proc = mock_popen.return_value
+            proc.wait.return_value = 0
+            _write_frames_ffmpeg(
+                self.test_images[:2], [0.5, 1.0], self.audio_path, output_path, fps=24
+            )
+
+        command = mock_popen.call_args[0][0]
+        self.assertEqual(command[0], 'ffmpeg')
+        self.assertIn(self.audio_path, command)
+        self.assertIn(output_path, command)
+
+        # 0.5s and 1.0s at 24 fps -> 12 + 24 raw rgb24 frames of 1920x1080
+        writes = proc.stdin.write.call_args_list
+        self.assertEqual(len(writes), 36)
+        self.assertTrue(all(len(call.args[0]) == 1920 * 1080 * 3 for call in writes))
+        proc.stdin.close.assert_called()
+
+    def test_write_frames_ffmpeg_reports_exit_status(self):
+        """Test that an early ffmpeg exit surfaces as RuntimeError, not a pipe error"""
+        output_path = os.path.join(self.test_dir, "streamed.mp4")
+
+        with patch('create_movie.subprocess.Popen') as mock_popen:
+            proc = mock_popen.return_value
+            # ffmpeg that rejects its input exits before draining stdin, so
+            # the writer sees a broken pipe
+            proc.stdin.write.side_effect = BrokenPipeError
+            proc.wait.return_value = 3
+
+            with self.assertRaises(RuntimeError) as context:
+                _write_frames_ffmpeg(
+                    self.test_images[:1], [1.0], self.audio_path, output_path, fps=24
+                )
+
+        self.assertIn("status 3", str(context.exception))
+
     def test_create_movie_missing_files(self):
         """Test error handling for missing input files"""
         output_path = os.path.join(self.test_dir, "test_output.mp4")
@@ -410,34 +439,69 @@ class TestCreateMovie(unittest.TestCase):
 
 
 class TestImageProcessing(unittest.TestCase):
-    """Additional tests for image processing edge cases"""
-    
-    def setUp(self):
-        self.test_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        shutil.rmtree(self.test_dir)
-    
+    """Tests for image processing, sharing one set of resized fixtures"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Write each test input once and resize it once; the test methods
+        below are pure assertions against the cached outputs"""
+        cls.test_dir = tempfile.mkdtemp()
+        sources = {
+            '800x600': Image.new('RGB', (800, 600), color=(255, 0, 0)),
+            'square': Image.new('RGB', (100, 100), color=(0, 255, 0)),
+            'rgba': Image.new('RGBA', (100, 100), color=(255, 0, 0, 128)),
+            'wide': Image.new('RGB', (2000, 100), color=(0, 0, 255)),
+            'tall': Image.new('RGB', (100, 2000), color=(255, 255, 0)),
+        }
+        cls.resized = {}
+        for name, img in sources.items():
+            img_path = os.path.join(cls.test_dir, f"{name}.png")
+            img.save(img_path)
+            cls.resized[name] = resize_image_to_standard(img_path, (1920, 1080))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.test_dir)
+
+    def test_resize_image_to_standard(self):
+        """Test image resizing functionality"""
+        resized = self.resized['800x600']
+
+        # Should return numpy array with target dimensions
+        self.assertEqual(resized.shape, (1080, 1920, 3))
+        self.assertIsInstance(resized, np.ndarray)
+
+    def test_resize_image_aspect_ratio_preservation(self):
+        """Test that aspect ratio is preserved during resize"""
+        resized = self.resized['square']
+
+        # Should have black borders (aspect ratio preservation)
+        # Check that the image is centered with black borders
+        self.assertEqual(resized.shape, (1080, 1920, 3))
+
+        # Check that corners are black (borders)
+        self.assertTrue(np.array_equal(resized[0, 0], [0, 0, 0]))
+        self.assertTrue(np.array_equal(resized[0, -1], [0, 0, 0]))
+
+    def test_resize_image_different_formats(self):
+        """Test resizing images with different color modes"""
+        resized = self.resized['rgba']
+
+        # Should convert to RGB and have correct dimensions
+        self.assertEqual(resized.shape, (1080, 1920, 3))
+
     def test_resize_very_wide_image(self):
         """Test resizing very wide image"""
-        test_img_path = os.path.join(self.test_dir, "wide_test.png")
-        img = Image.new('RGB', (2000, 100), color=(0, 0, 255))
-        img.save(test_img_path)
-        
-        resized = resize_image_to_standard(test_img_path, (1920, 1080))
-        
+        resized = self.resized['wide']
+
         self.assertEqual(resized.shape, (1080, 1920, 3))
         # Should have horizontal black bars
         self.assertTrue(np.array_equal(resized[0, 960], [0, 0, 0]))
-    
+
     def test_resize_very_tall_image(self):
         """Test resizing very tall image"""
-        test_img_path = os.path.join(self.test_dir, "tall_test.png")
-        img = Image.new('RGB', (100, 2000), color=(255, 255, 0))
-        img.save(test_img_path)
-        
-        resized = resize_image_to_standard(test_img_path, (1920, 1080))
-        
+        resized = self.resized['tall']
+
         self.assertEqual(resized.shape, (1080, 1920, 3))
         # Should have vertical black bars
         self.assertTrue(np.array_equal(resized[540, 0], [0, 0, 0]))
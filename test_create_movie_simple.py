@@ -4,87 +4,90 @@ Simple tests that don't require moviepy installation.
 These tests focus on the core logic functions that can be tested independently.
 """
 import unittest
+import contextlib
 import os
 import tempfile
 import shutil
+import types
 import numpy as np
 from PIL import Image
 import sys
-import importlib.util
+from unittest.mock import Mock, patch
+
+# Stub moviepy before importing create_movie so the module imports cleanly
+# without the real dependency installed
+sys.modules.setdefault('moviepy', Mock())
+sys.modules.setdefault('moviepy.editor', Mock())
+
+from create_movie import (
+    get_image_files,
+    calculate_progressive_duration,
+    resize_image_to_standard,
+)
+
+
+# Number of synthetic fixture entries per test; CI can set
+# MONTAGERIZER_TEST_N=4 to shrink the fixture set
+TEST_IMAGE_COUNT = int(os.environ.get('MONTAGERIZER_TEST_N', '20'))
+
+
+class _FakeDirEntry:
+    """Minimal os.DirEntry stand-in backed by synthetic metadata"""
+
+    def __init__(self, path, mtime):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._mtime = mtime
+
+    def is_file(self):
+        return True
+
+    def stat(self):
+        return types.SimpleNamespace(st_mtime=self._mtime)
 
-# Import only the functions we can test without moviepy
-def import_functions_from_create_movie():
-    """Import specific functions from create_movie without importing moviepy dependencies"""
-    spec = importlib.util.spec_from_file_location("create_movie", "create_movie.py")
-    
-    # Read the file and extract just the functions we need
-    with open("create_movie.py", "r") as f:
-        content = f.read()
-    
-    # Create a modified version that doesn't import moviepy
-    modified_content = content.replace(
-        "from moviepy import ImageSequenceClip, AudioFileClip",
-        "# moviepy imports removed for testing"
-    )
-    
-    # Execute the modified code in a namespace
-    namespace = {}
-    exec(modified_content, namespace)
-    
-    return (
-        namespace['get_image_files'],
-        namespace['calculate_progressive_duration'],
-        namespace['resize_image_to_standard']
-    )
 
-try:
-    get_image_files, calculate_progressive_duration, resize_image_to_standard = import_functions_from_create_movie()
-    FUNCTIONS_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: Could not import functions: {e}")
-    FUNCTIONS_AVAILABLE = False
+@contextlib.contextmanager
+def _patched_scandir(entries):
+    """Patch create_movie's os.scandir to yield the given synthetic entries
+
+    Scoped to a with block so the global patch never outlives the call under
+    test; tearDown's rmtree relies on the real os.scandir.
+    """
+    with patch('create_movie.os.scandir') as scandir:
+        scandir.return_value.__enter__.return_value = iter(entries)
+        yield
 
 
 class TestCreateMovieSimple(unittest.TestCase):
-    
+
     def setUp(self):
         """Set up test fixtures"""
-        if not FUNCTIONS_AVAILABLE:
-            self.skipTest("Functions not available for testing")
-            
         self.test_dir = tempfile.mkdtemp()
-        self.images_dir = os.path.join(self.test_dir, "images")
-        os.makedirs(self.images_dir)
-        
-        # Create test images
-        self.test_images = []
-        for i in range(20):
-            img_path = os.path.join(self.images_dir, f"test_image_{i:02d}.png")
-            # Create a simple test image
-            img = Image.new('RGB', (100, 100), color=(i*10 % 255, 0, 0))
-            img.save(img_path)
-            self.test_images.append(img_path)
-    
+
     def tearDown(self):
         """Clean up test fixtures"""
-        if hasattr(self, 'test_dir'):
-            shutil.rmtree(self.test_dir)
-    
+        shutil.rmtree(self.test_dir)
+
     def test_get_image_files(self):
-        """Test getting image files from directory"""
-        image_files = get_image_files(self.images_dir)
-        
-        self.assertEqual(len(image_files), 20)
+        """Test getting image files from a directory of synthetic entries"""
+        entries = [
+            _FakeDirEntry(f"images/test_image_{i:02d}.png", 1000.0 + i)
+            for i in range(TEST_IMAGE_COUNT)
+        ]
+        # Present the entries out of order; get_image_files must sort by mtime
+        scrambled = entries[::2] + entries[1::2]
+        with _patched_scandir(scrambled):
+            image_files = get_image_files("images")
+
+        self.assertEqual(len(image_files), TEST_IMAGE_COUNT)
         self.assertTrue(all(f.endswith('.png') for f in image_files))
         # Files should be sorted by modification time
-        self.assertEqual(image_files, sorted(image_files, key=os.path.getmtime))
-    
+        self.assertEqual(image_files, [entry.path for entry in entries])
+
     def test_get_image_files_empty_directory(self):
         """Test getting image files from empty directory"""
-        empty_dir = os.path.join(self.test_dir, "empty")
-        os.makedirs(empty_dir)
-        
-        image_files = get_image_files(empty_dir)
+        with _patched_scandir([]):
+            image_files = get_image_files("empty")
         self.assertEqual(len(image_files), 0)
     
     def test_calculate_progressive_duration_basic(self):
@@ -162,8 +165,4 @@ class TestCreateMovieSimple(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    if not FUNCTIONS_AVAILABLE:
-        print("Skipping tests - functions not available")
-        sys.exit(0)
-    else:
-        unittest.main()
\ No newline at end of file
+    unittest.main()
\ No newline at end of file